@@ -1,8 +1,13 @@
 """Flask web application for Reddit Sentiment Trading Bot."""
 
 import os
+import threading
+from functools import lru_cache
 from datetime import datetime
-from flask import Flask, render_template, jsonify, request
+import orjson
+from cachetools import TTLCache, cached
+from cachetools.keys import hashkey
+from flask import Flask, render_template, request
 from dotenv import load_dotenv
 
 from src.database import TradingDatabase
@@ -13,6 +18,12 @@ from src.signals import SignalGenerator
 # Load environment variables
 load_dotenv()
 
+# Subreddits are parsed once at startup
+SUBREDDITS = tuple(
+    s.strip() for s in os.getenv('REDDIT_SUBREDDITS', 'CryptoCurrency,Bitcoin,ethereum').split(',')
+)
+SUBREDDITS_JOINED = ','.join(SUBREDDITS)
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-prod')
 
@@ -20,6 +31,61 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-pro
 db = TradingDatabase(os.getenv('DATABASE_PATH', 'data/trading.db'))
 
 
+@lru_cache(maxsize=None)
+def get_scraper() -> RedditScraper:
+    """Shared scraper, created on first use."""
+    return RedditScraper()
+
+
+@lru_cache(maxsize=None)
+def get_analyzer() -> SentimentAnalyzer:
+    """Shared analyzer, so its HTTP connection pools persist across requests."""
+    return SentimentAnalyzer()
+
+
+@lru_cache(maxsize=None)
+def get_signal_generator() -> SignalGenerator:
+    """Shared signal generator, created on first use."""
+    return SignalGenerator(
+        min_confidence=float(os.getenv('MIN_CONFIDENCE_SCORE', 0.6))
+    )
+
+
+def ojson(obj, status=200):
+    """Build a JSON response using orjson."""
+    return app.response_class(orjson.dumps(obj), status=status,
+                              mimetype='application/json')
+
+
+# Short-lived cache for dashboard reads, cleared whenever a scrape writes
+_read_cache = TTLCache(maxsize=16, ttl=5)
+_read_cache_lock = threading.Lock()
+
+
+@cached(_read_cache, key=lambda: hashkey('stats'), lock=_read_cache_lock)
+def _cached_stats():
+    """Performance statistics, cached briefly."""
+    return db.get_performance_stats()
+
+
+@cached(_read_cache, key=lambda limit: hashkey('signals', limit), lock=_read_cache_lock)
+def _cached_signals(limit):
+    """Recent signals, cached briefly per limit."""
+    return db.get_recent_signals(limit)
+
+
+@cached(_read_cache, key=lambda limit: hashkey('trades', limit), lock=_read_cache_lock)
+def _cached_trades(limit):
+    """Recent paper trades, cached briefly per limit."""
+    return db.get_recent_trades(limit)
+
+
+@cached(_read_cache, key=lambda limit: hashkey('posts', limit), lock=_read_cache_lock)
+def _cached_posts(limit):
+    """Recently analyzed posts, cached briefly per limit."""
+    return db.get_recent_posts(limit)
+
+
 @app.route('/')
 def index():
     """Main dashboard page."""
@@ -29,105 +95,95 @@ def index():
 @app.route('/api/stats')
 def get_stats():
     """Get performance statistics."""
-    stats = db.get_performance_stats()
-    return jsonify(stats)
+    stats = _cached_stats()
+    return ojson(stats)
 
 
 @app.route('/api/signals')
 def get_signals():
     """Get recent trading signals."""
     limit = request.args.get('limit', 20, type=int)
-    signals = db.get_recent_signals(limit)
-    return jsonify(signals)
+    signals = _cached_signals(limit)
+    return ojson(signals)
 
 
 @app.route('/api/trades')
 def get_trades():
     """Get recent paper trades."""
     limit = request.args.get('limit', 20, type=int)
-    trades = db.get_recent_trades(limit)
-    return jsonify(trades)
+    trades = _cached_trades(limit)
+    return ojson(trades)
 
 
 @app.route('/api/posts')
 def get_posts():
     """Get recently analyzed posts."""
     limit = request.args.get('limit', 50, type=int)
-    posts = db.get_recent_posts(limit)
-    return jsonify(posts)
+    posts = _cached_posts(limit)
+    return ojson(posts)
 
 
 @app.route('/api/scrape', methods=['POST'])
 def trigger_scrape():
     """Manually trigger a scrape and analysis."""
     try:
-        subreddits = os.getenv('REDDIT_SUBREDDITS', 'CryptoCurrency,Bitcoin,ethereum').split(',')
         max_posts = int(os.getenv('MAX_POSTS_PER_SCRAPE', 50))
 
-        # Initialize scraper
-        scraper = RedditScraper()
+        scraper = get_scraper()
+
+        # Scrape all subreddits in one actor run, keeping the configured order
+        results = scraper.scrape_multiple_subreddits(list(SUBREDDITS), max_posts)
+        all_posts = [post for subreddit in SUBREDDITS for post in results[subreddit]]
 
-        # Scrape posts
-        all_posts = []
-        for subreddit in subreddits:
-            posts = scraper.scrape_subreddit(subreddit.strip(), max_posts)
-            all_posts.extend(posts)
+        # Skip posts we've already analyzed
+        existing_ids = db.existing_post_ids([p.id for p in all_posts])
+        fresh_posts = [p for p in all_posts if p.id not in existing_ids]
 
         # Analyze sentiment
-        analyzer = SentimentAnalyzer()
-        analyzed_posts = analyzer.analyze_batch(all_posts[:20])  # Limit to avoid high API costs
+        analyzer = get_analyzer()
+        analyzed_posts = analyzer.analyze_batch(fresh_posts[:20])  # Limit to avoid high API costs
+
+        # Failed analyses aren't stored, so the next scrape retries them
+        failed_count = sum(bool(p.get('analysis_failed')) for p in analyzed_posts)
+        analyzed_posts = [p for p in analyzed_posts if not p.get('analysis_failed')]
 
         # Store analyzed posts
-        for post in analyzed_posts:
-            db.add_analyzed_post(
-                post_id=post['id'],
-                subreddit=post['subreddit'],
-                title=post['title'],
-                content=post['content'],
-                sentiment=post['sentiment'],
-                sentiment_score=post['sentiment_score'],
-                mentioned_assets=','.join(post.get('mentioned_assets', [])),
-                url=post.get('url', '')
-            )
+        db.add_analyzed_posts(analyzed_posts)
 
         # Generate signals
-        signal_gen = SignalGenerator(
-            min_confidence=float(os.getenv('MIN_CONFIDENCE_SCORE', 0.6))
-        )
+        signal_gen = get_signal_generator()
         signals = signal_gen.generate_signals_from_posts(analyzed_posts)
 
         # Store signals
-        stored_signals = []
-        for signal in signals:
-            signal_id = db.add_signal(
-                asset=signal['asset'],
-                signal_type=signal['signal_type'],
-                confidence_score=signal['confidence_score'],
-                sentiment_score=signal['sentiment_score'],
-                source_subreddit=','.join(subreddits),
-                post_count=signal['post_count'],
-                reasoning=signal['reasoning']
-            )
-            stored_signals.append({**signal, 'id': signal_id})
-
-        return jsonify({
+        signal_ids = db.add_signals(signals, source_subreddit=SUBREDDITS_JOINED)
+        stored_signals = [
+            {**signal, 'id': signal_id}
+            for signal, signal_id in zip(signals, signal_ids)
+        ]
+
+        # Make the new data visible on the next dashboard poll
+        with _read_cache_lock:
+            _read_cache.clear()
+
+        return ojson({
             'success': True,
             'posts_analyzed': len(analyzed_posts),
+            'posts_failed': failed_count,
             'signals_generated': len(signals),
             'signals': stored_signals
         })
 
     except Exception as e:
-        return jsonify({
+        return ojson({
             'success': False,
             'error': str(e)
-        }), 500
+        }, 500)
 
 
 @app.route('/api/health')
 def health():
     """Health check endpoint."""
-    return jsonify({
+    return ojson({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat()
     })
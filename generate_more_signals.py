@@ -1,10 +1,28 @@
 #!/usr/bin/env python3
 """Generate additional test signals with more variety."""
 
-import random
+import numpy as np
 from src.database import TradingDatabase
 from src.signals import SignalGenerator
 
+BULLISH_TITLES = (
+    "{asset} breaking out! Great fundamentals",
+    "Why I'm bullish on {asset} long term",
+    "{asset} looking extremely strong right now",
+    "Just bought more {asset}, here's why",
+    "{asset} is the future of crypto"
+)
+
+BEARISH_TITLES = (
+    "Concerns about {asset} long-term viability",
+    "Why I sold all my {asset}",
+    "{asset} looking weak, possible downturn",
+    "Red flags in {asset} project",
+    "Time to exit {asset}?"
+)
+
+SUBREDDITS = ('CryptoCurrency', 'Bitcoin', 'ethereum')
+
 def generate_varied_posts():
     """Generate posts with varied sentiment patterns."""
     # Create scenarios with strong sentiment for certain assets
@@ -16,48 +34,46 @@ def generate_varied_posts():
         ('AVAX', 'bullish', 5),  # 5 bullish AVAX posts
     ]
 
+    rng = np.random.default_rng()
     posts = []
     post_id = 1000
 
     for asset, sentiment, count in scenarios:
-        for i in range(count):
-            if sentiment == 'bullish':
-                titles = [
-                    f"{asset} breaking out! Great fundamentals",
-                    f"Why I'm bullish on {asset} long term",
-                    f"{asset} looking extremely strong right now",
-                    f"Just bought more {asset}, here's why",
-                    f"{asset} is the future of crypto"
-                ]
-                sentiment_score = random.uniform(0.5, 0.9)
-            else:  # bearish
-                titles = [
-                    f"Concerns about {asset} long-term viability",
-                    f"Why I sold all my {asset}",
-                    f"{asset} looking weak, possible downturn",
-                    f"Red flags in {asset} project",
-                    f"Time to exit {asset}?"
-                ]
-                sentiment_score = random.uniform(-0.9, -0.5)
-
-            title = random.choice(titles)
-            content = f"Detailed analysis of {asset}. {sentiment.capitalize()} outlook based on fundamentals."
-
-            post = {
-                'id': f'test_{post_id}',
-                'title': title,
+        if sentiment == 'bullish':
+            templates = BULLISH_TITLES
+            score_range = (0.5, 0.9)
+        else:  # bearish
+            templates = BEARISH_TITLES
+            score_range = (-0.9, -0.5)
+
+        titles = [t.format(asset=asset) for t in templates]
+        content = f"Detailed analysis of {asset}. {sentiment.capitalize()} outlook based on fundamentals."
+
+        # Draw every random field for the scenario at once
+        title_idx = rng.integers(0, len(titles), size=count).tolist()
+        scores = rng.integers(100, 2001, size=count).tolist()
+        num_comments = rng.integers(20, 501, size=count).tolist()
+        subreddit_idx = rng.integers(0, len(SUBREDDITS), size=count).tolist()
+        sentiment_scores = rng.uniform(*score_range, size=count).tolist()
+        confidences = rng.uniform(0.65, 0.95, size=count).tolist()
+
+        posts.extend(
+            {
+                'id': f'test_{post_id + i}',
+                'title': titles[title_idx[i]],
                 'content': content,
-                'score': random.randint(100, 2000),
-                'num_comments': random.randint(20, 500),
-                'subreddit': random.choice(['CryptoCurrency', 'Bitcoin', 'ethereum']),
+                'score': scores[i],
+                'num_comments': num_comments[i],
+                'subreddit': SUBREDDITS[subreddit_idx[i]],
                 'sentiment': sentiment,
-                'sentiment_score': sentiment_score,
-                'confidence': random.uniform(0.65, 0.95),
+                'sentiment_score': sentiment_scores[i],
+                'confidence': confidences[i],
                 'mentioned_assets': [asset],
                 'key_themes': ['cryptocurrency', 'trading']
             }
-            posts.append(post)
-            post_id += 1
+            for i in range(count)
+        )
+        post_id += count
 
     return posts
 
@@ -71,40 +87,24 @@ def main():
     posts = generate_varied_posts()
 
     # Store posts
-    for post in posts:
-        db.add_analyzed_post(
-            post_id=post['id'],
-            subreddit=post['subreddit'],
-            title=post['title'],
-            content=post['content'],
-            sentiment=post['sentiment'],
-            sentiment_score=post['sentiment_score'],
-            mentioned_assets=','.join(post['mentioned_assets']),
-            url=f"https://reddit.com/{post['id']}"
-        )
+    db.add_analyzed_posts([
+        {**post, 'url': f"https://reddit.com/{post['id']}"} for post in posts
+    ])
 
     # Generate signals
     signals = signal_gen.generate_signals_from_posts(posts)
 
+    # Store signals
+    signal_ids = db.add_signals(signals, source_subreddit=','.join(SUBREDDITS))
+
     print(f"\nGenerated {len(signals)} new signals:")
 
-    for signal in signals:
+    for signal, signal_id in zip(signals, signal_ids):
         print(f"\n  {signal['asset']}: {signal['signal_type']}")
         print(f"    Confidence: {signal['confidence_score']:.1%}")
         print(f"    Sentiment: {signal['sentiment_score']:.2f}")
         print(f"    Posts: {signal['post_count']}")
 
-        # Store signal
-        signal_id = db.add_signal(
-            asset=signal['asset'],
-            signal_type=signal['signal_type'],
-            confidence_score=signal['confidence_score'],
-            sentiment_score=signal['sentiment_score'],
-            source_subreddit='CryptoCurrency,Bitcoin,ethereum',
-            post_count=signal['post_count'],
-            reasoning=signal['reasoning']
-        )
-
         # Create paper trade
         mock_prices = {
             'BTC': 45000, 'ETH': 2500, 'SOL': 100,
@@ -13,6 +13,12 @@ from src.signals import SignalGenerator
 # Load environment variables
 load_dotenv()
 
+# Subreddits are parsed once at startup
+SUBREDDITS = tuple(
+    s.strip() for s in os.getenv('REDDIT_SUBREDDITS', 'CryptoCurrency,Bitcoin,ethereum').split(',')
+)
+SUBREDDITS_JOINED = ','.join(SUBREDDITS)
+
 
 def main():
     """Run the scraper and generate signals."""
@@ -21,12 +27,11 @@ def main():
     print("=" * 60)
 
     # Configuration
-    subreddits = os.getenv('REDDIT_SUBREDDITS', 'CryptoCurrency,Bitcoin,ethereum').split(',')
     max_posts = int(os.getenv('MAX_POSTS_PER_SCRAPE', 50))
     min_confidence = float(os.getenv('MIN_CONFIDENCE_SCORE', 0.6))
 
     print(f"\nConfiguration:")
-    print(f"  Subreddits: {', '.join(subreddits)}")
+    print(f"  Subreddits: {', '.join(SUBREDDITS)}")
     print(f"  Max posts per subreddit: {max_posts}")
     print(f"  Min confidence score: {min_confidence}")
 
@@ -42,13 +47,13 @@ def main():
     print("Step 1: Scraping Reddit")
     print("=" * 60)
 
+    results = scraper.scrape_multiple_subreddits(list(SUBREDDITS), max_posts)
+
     all_posts = []
-    for subreddit in subreddits:
-        subreddit = subreddit.strip()
-        print(f"\nScraping r/{subreddit}...")
-        posts = scraper.scrape_subreddit(subreddit, max_posts)
+    for subreddit in SUBREDDITS:
+        posts = results[subreddit]
         all_posts.extend(posts)
-        print(f"  ✓ Scraped {len(posts)} posts")
+        print(f"  ✓ Scraped {len(posts)} posts from r/{subreddit}")
 
     print(f"\nTotal posts scraped: {len(all_posts)}")
 
@@ -57,27 +62,28 @@ def main():
     print("Step 2: Analyzing Sentiment")
     print("=" * 60)
 
+    # Skip posts we've already analyzed
+    existing_ids = db.existing_post_ids([p.id for p in all_posts])
+    fresh_posts = [p for p in all_posts if p.id not in existing_ids]
+    print(f"\nSkipping {len(all_posts) - len(fresh_posts)} already analyzed posts")
+
     # Limit to avoid high API costs in testing
-    posts_to_analyze = all_posts[:20]
+    posts_to_analyze = fresh_posts[:20]
     print(f"\nAnalyzing {len(posts_to_analyze)} posts with Claude...")
 
     analyzed_posts = analyzer.analyze_batch(posts_to_analyze)
 
+    # Failed analyses aren't stored, so the next run retries them
+    failed_count = sum(bool(p.get('analysis_failed')) for p in analyzed_posts)
+    analyzed_posts = [p for p in analyzed_posts if not p.get('analysis_failed')]
+
     print(f"  ✓ Analyzed {len(analyzed_posts)} posts")
+    if failed_count:
+        print(f"  ✗ {failed_count} posts failed analysis and will be retried next run")
 
     # Store analyzed posts
     print("\nStoring analyzed posts in database...")
-    for post in analyzed_posts:
-        db.add_analyzed_post(
-            post_id=post['id'],
-            subreddit=post['subreddit'],
-            title=post['title'],
-            content=post['content'],
-            sentiment=post['sentiment'],
-            sentiment_score=post['sentiment_score'],
-            mentioned_assets=','.join(post.get('mentioned_assets', [])),
-            url=post.get('url', '')
-        )
+    db.add_analyzed_posts(analyzed_posts)
 
     # Generate signals
     print("\n" + "=" * 60)
@@ -86,9 +92,12 @@ def main():
 
     signals = signal_gen.generate_signals_from_posts(analyzed_posts)
 
+    # Store signals
+    signal_ids = db.add_signals(signals, source_subreddit=SUBREDDITS_JOINED)
+
     print(f"\nGenerated {len(signals)} trading signals:")
 
-    for i, signal in enumerate(signals, 1):
+    for i, (signal, signal_id) in enumerate(zip(signals, signal_ids), 1):
         print(f"\n  Signal {i}:")
         print(f"    Asset: {signal['asset']}")
         print(f"    Type: {signal['signal_type']}")
@@ -97,16 +106,6 @@ def main():
         print(f"    Based on: {signal['post_count']} posts")
         print(f"    Reasoning: {signal['reasoning']}")
 
-        # Store signal
-        signal_id = db.add_signal(
-            asset=signal['asset'],
-            signal_type=signal['signal_type'],
-            confidence_score=signal['confidence_score'],
-            sentiment_score=signal['sentiment_score'],
-            source_subreddit=','.join(subreddits),
-            post_count=signal['post_count'],
-            reasoning=signal['reasoning']
-        )
         print(f"    ✓ Stored as signal ID: {signal_id}")
 
     # Display stats
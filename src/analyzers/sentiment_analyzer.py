@@ -1,21 +1,275 @@
 """Sentiment analyzer using Claude API."""
 
 import os
-import json
-from typing import Dict, Any, List
-from anthropic import Anthropic
+import re
+import asyncio
+import threading
+from itertools import islice
+from typing import TYPE_CHECKING, Dict, Any, List, Optional
+import orjson
+from anthropic import Anthropic, AsyncAnthropic, APIError
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+# Only needed for annotations; importing it at runtime would pull in the scraper's dependencies
+if TYPE_CHECKING:
+    from ..scrapers import RedditPost
+
+# Numba is optional; without it aggregation stays on the pure-Python loop
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:
+    np = None
+    njit = None
+
+# Model and response budgets for single-post and multi-post requests
+CLAUDE_MODEL = "claude-3-5-sonnet-20241022"
+POST_MAX_TOKENS = 1024
+CHUNK_MAX_TOKENS = 4096
+
+# Claude sometimes wraps its JSON in prose or code fences
+_JSON_RE = re.compile(r'\{.*\}', re.S)
+_JSON_ARRAY_RE = re.compile(r'\[.*\]', re.S)
+
+# Assets the local triage can attribute a post to without asking Claude.
+# Tickers only match in uppercase; full names only where they aren't everyday
+# words (no "ripple", "avalanche", "polygon", "sol", "ada")
+_TICKERS = ('BTC', 'ETH', 'SOL', 'ADA', 'DOGE', 'MATIC', 'AVAX', 'XRP')
+_ASSET_NAMES = {
+    'bitcoin': 'BTC',
+    'ethereum': 'ETH',
+    'solana': 'SOL',
+    'cardano': 'ADA',
+    'dogecoin': 'DOGE',
+}
+_ASSET_RE = re.compile(
+    r'\b(?:(' + '|'.join(_TICKERS) + r')|(?i:(' + '|'.join(_ASSET_NAMES) + r')))\b'
+)
+
+# VADER compound magnitude isn't Claude-calibrated confidence. Triaged posts are
+# mapped linearly from (local_threshold, 1.0] onto this band: the floor equals
+# the default MIN_CONFIDENCE_SCORE so clear-cut posts don't drag an asset's
+# average confidence below the signal gate, and the ceiling stays under a
+# confident Claude call so VADER alone never outweighs one
+_LOCAL_CONFIDENCE_MIN = 0.6
+_LOCAL_CONFIDENCE_MAX = 0.8
+
+# Below this many posts, building arrays costs more than the kernel saves
+_NUMBA_MIN_POSTS = 1000
+_SENTIMENT_CODES = {'bullish': 1, 'bearish': -1, 'neutral': 0}
+
+if njit is not None:
+    @njit(cache=True)
+    def _aggregate_kernel(scores, confidences, weights, sentiments):
+        """Reduce per-post columns to (bullish, bearish, neutral, sums...)."""
+        bullish = bearish = neutral = 0
+        sentiment_sum = confidence_sum = weighted_sum = total_weight = 0.0
+        for i in range(scores.shape[0]):
+            if sentiments[i] == 1:
+                bullish += 1
+            elif sentiments[i] == -1:
+                bearish += 1
+            elif sentiments[i] == 0:
+                neutral += 1
+            sentiment_sum += scores[i]
+            confidence_sum += confidences[i]
+            weighted_sum += scores[i] * weights[i]
+            total_weight += weights[i]
+        return (bullish, bearish, neutral, sentiment_sum, confidence_sum,
+                weighted_sum, total_weight)
+else:
+    _aggregate_kernel = None
+
+# Instructions shared by the single-post and multi-post prompts
+_ANALYSIS_FIELDS = """1. sentiment: "bullish", "bearish", or "neutral"
+2. sentiment_score: a float from -1.0 (very bearish) to 1.0 (very bullish)
+3. confidence: float from 0.0 to 1.0 indicating how confident you are
+4. mentioned_assets: list of crypto assets mentioned (e.g., ["BTC", "ETH", "DOGE"])
+5. key_themes: list of main themes/topics discussed
+6. reasoning: brief explanation of your sentiment analysis
+
+Only respond with valid JSON, no other text."""
+
+# Static instruction blocks are sent first and marked for prompt caching, so
+# they must stay byte-identical across calls (no substitutions)
+_PROMPT_STATIC = """Analyze the Reddit post about cryptocurrency that follows and provide sentiment analysis.
+
+Please analyze and respond with a JSON object containing:
+""" + _ANALYSIS_FIELDS
+
+_PROMPT = """Post Title: {title}
+
+Post Content: {content}
+
+Post Engagement: Score={score}, Comments={comments}"""
+
+_CHUNK_PROMPT_STATIC = """Analyze the Reddit posts about cryptocurrency that follow and provide sentiment analysis for each one.
+
+Respond with a JSON array with one element per post, where element i analyzes Post i.
+Each element must be a JSON object containing:
+""" + _ANALYSIS_FIELDS
+
+_CHUNK_POST = "Post {index}: title={title} content={content} score={score} comments={comments}"
+
+_CHUNK_PROMPT = """{posts}
+
+Respond with a JSON array of length {count}."""
+
+
+def _cached_content(static_text: str, variable_text: str) -> List[Dict[str, Any]]:
+    """Message content with the static instructions marked as cacheable."""
+    return [
+        {"type": "text", "text": static_text, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": variable_text}
+    ]
+
+
+def _message_params(content: List[Dict[str, Any]], max_tokens: int) -> Dict[str, Any]:
+    """Keyword arguments for a Claude messages.create call."""
+    return {
+        "model": CLAUDE_MODEL,
+        "max_tokens": max_tokens,
+        "messages": [{"role": "user", "content": content}]
+    }
 
 
 class SentimentAnalyzer:
     """Analyzes sentiment of Reddit posts using Claude."""
 
-    def __init__(self, api_key: str = None):
+    _REQUIRED_KEYS = frozenset({
+        'sentiment', 'sentiment_score', 'confidence',
+        'mentioned_assets', 'key_themes', 'reasoning'
+    })
+
+    def __init__(self, api_key: str = None, batch_size: int = 10,
+                 local_threshold: float = 0.6):
         """Initialize the analyzer with Anthropic API key."""
         self.api_key = api_key or os.getenv('ANTHROPIC_API_KEY')
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY is required")
 
-        self.client = Anthropic(api_key=self.api_key)
+        # The SDK retries 429/5xx and connection errors with backoff and keeps
+        # its HTTP connection pool alive across calls
+        self.client = Anthropic(api_key=self.api_key, max_retries=4, timeout=30.0)
+        self.aclient = AsyncAnthropic(api_key=self.api_key, max_retries=4, timeout=30.0)
+        self.batch_size = batch_size
+
+        # The async client's connection pool is bound to the loop that first
+        # uses it, so every batch runs on one long-lived background loop
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+        # Posts VADER scores beyond this |compound| are resolved locally
+        self.local_threshold = local_threshold
+        self.vader = SentimentIntensityAnalyzer()
+
+    def _build_prompt(self, title: str, content: str, score: int = 0,
+                      num_comments: int = 0) -> List[Dict[str, Any]]:
+        """Build the Claude message content for a single post."""
+        return _cached_content(
+            _PROMPT_STATIC,
+            _PROMPT.format(title=title, content=content, score=score,
+                           comments=num_comments)
+        )
+
+    def _build_chunk_prompt(self, posts: List["RedditPost"]) -> List[Dict[str, Any]]:
+        """Build the Claude message content covering several posts."""
+        post_blocks = "\n\n".join(
+            _CHUNK_POST.format(
+                index=i,
+                title=post.title,
+                content=post.content,
+                score=post.score,
+                comments=post.num_comments
+            )
+            for i, post in enumerate(posts)
+        )
+
+        return _cached_content(
+            _CHUNK_PROMPT_STATIC,
+            _CHUNK_PROMPT.format(posts=post_blocks, count=len(posts))
+        )
+
+    @staticmethod
+    def _response_text(message: Any) -> str:
+        """Text of a Claude response; empty or non-text content is a parse failure."""
+        for block in message.content or ():
+            if getattr(block, 'type', None) == 'text':
+                return block.text
+        raise ValueError("No text content in response")
+
+    @staticmethod
+    def _extract_json(response_text: str, pattern: re.Pattern) -> Any:
+        """Parse the JSON matched by ``pattern`` out of a Claude response."""
+        match = pattern.search(response_text)
+        if not match:
+            raise ValueError("No JSON found in response")
+        return orjson.loads(match.group(0))
+
+    def _parse_chunk(self, response_text: str, count: int) -> List[Dict[str, Any]]:
+        """Parse a chunk response, falling back to neutral per bad element."""
+        results = self._extract_json(response_text, _JSON_ARRAY_RE)
+        if not isinstance(results, list):
+            raise ValueError("Expected a JSON array of analyses")
+
+        parsed = []
+        for i in range(count):
+            result = results[i] if i < len(results) else None
+            if not isinstance(result, dict) or not self._REQUIRED_KEYS <= result.keys():
+                result = self._neutral_result(ValueError(f"Missing analysis for post {i}"))
+            parsed.append(result)
+
+        return parsed
+
+    @staticmethod
+    def _neutral_result(error: Exception) -> Dict[str, Any]:
+        """Neutral sentiment returned when analysis fails.
+
+        Flagged with analysis_failed so callers can keep it out of storage and
+        retry the post on a later run.
+        """
+        return {
+            'sentiment': 'neutral',
+            'sentiment_score': 0.0,
+            'confidence': 0.0,
+            'mentioned_assets': [],
+            'key_themes': [],
+            'reasoning': f'Error during analysis: {str(error)}',
+            'analysis_failed': True
+        }
+
+    def _analyze_local(self, title: str, content: str) -> Optional[Dict[str, Any]]:
+        """
+        Triage a post with VADER before paying for a Claude call.
+
+        Returns:
+            Sentiment analysis result if the post is clear-cut and mentions a
+            known asset, otherwise None to escalate to Claude
+        """
+        text = f"{title} {content}"
+        compound = self.vader.polarity_scores(text)['compound']
+        if abs(compound) <= self.local_threshold:
+            return None
+
+        mentioned_assets = list(dict.fromkeys(
+            ticker or _ASSET_NAMES[name.lower()]
+            for ticker, name in _ASSET_RE.findall(text)
+        ))
+        if not mentioned_assets:
+            return None
+
+        # Rescale |compound| from (local_threshold, 1.0] onto the local confidence band
+        strength = (abs(compound) - self.local_threshold) / (1.0 - self.local_threshold)
+        confidence = _LOCAL_CONFIDENCE_MIN + (_LOCAL_CONFIDENCE_MAX - _LOCAL_CONFIDENCE_MIN) * strength
+
+        return {
+            'sentiment': 'bullish' if compound > 0 else 'bearish',
+            'sentiment_score': compound,
+            'confidence': confidence,
+            'mentioned_assets': mentioned_assets,
+            'key_themes': [],
+            'reasoning': f'Local VADER triage: compound score {compound:.2f}'
+        }
 
     def analyze_post(self, title: str, content: str, score: int = 0,
                      num_comments: int = 0) -> Dict[str, Any]:
@@ -31,91 +285,179 @@ class SentimentAnalyzer:
         Returns:
             Dictionary with sentiment analysis results
         """
-        prompt = f"""Analyze this Reddit post about cryptocurrency and provide sentiment analysis.
+        local = self._analyze_local(title, content)
+        if local:
+            return local
 
-Post Title: {title}
-
-Post Content: {content}
-
-Post Engagement: Score={score}, Comments={num_comments}
-
-Please analyze and respond with a JSON object containing:
-1. sentiment: "bullish", "bearish", or "neutral"
-2. sentiment_score: a float from -1.0 (very bearish) to 1.0 (very bullish)
-3. confidence: float from 0.0 to 1.0 indicating how confident you are
-4. mentioned_assets: list of crypto assets mentioned (e.g., ["BTC", "ETH", "DOGE"])
-5. key_themes: list of main themes/topics discussed
-6. reasoning: brief explanation of your sentiment analysis
-
-Only respond with valid JSON, no other text."""
+        prompt = self._build_prompt(title, content, score, num_comments)
 
         try:
             message = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=1024,
-                messages=[{
-                    "role": "user",
-                    "content": prompt
-                }]
+                **_message_params(prompt, POST_MAX_TOKENS)
             )
 
             # Extract JSON from response
-            response_text = message.content[0].text
-            result = json.loads(response_text)
+            response_text = self._response_text(message)
+            result = self._extract_json(response_text, _JSON_RE)
 
             return result
 
-        except Exception as e:
+        except (APIError, ValueError) as e:
             print(f"Error analyzing post: {e}")
             # Return neutral sentiment on error
-            return {
-                'sentiment': 'neutral',
-                'sentiment_score': 0.0,
-                'confidence': 0.0,
-                'mentioned_assets': [],
-                'key_themes': [],
-                'reasoning': f'Error during analysis: {str(e)}'
-            }
+            return self._neutral_result(e)
+
+    def _run(self, coro):
+        """Run ``coro`` on the analyzer's background event loop and wait for it."""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, daemon=True).start()
+
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _analyze_chunk_async(self, posts: List["RedditPost"],
+                                   sem: asyncio.Semaphore) -> List[Dict[str, Any]]:
+        """Analyze a chunk of posts on the async client, bounded by ``sem``."""
+        async with sem:
+            message = await self.aclient.messages.create(
+                **_message_params(self._build_chunk_prompt(posts), CHUNK_MAX_TOKENS)
+            )
+
+        return self._parse_chunk(self._response_text(message), len(posts))
+
+    async def _analyze_batch_async(self, posts: List["RedditPost"],
+                                   max_concurrency: int = 10) -> List[Dict[str, Any]]:
+        """Analyze all chunks concurrently, one Claude request per chunk."""
+        sem = asyncio.Semaphore(max_concurrency)
+
+        it = iter(posts)
+        chunks = list(iter(lambda: list(islice(it, self.batch_size)), []))
+
+        results = await asyncio.gather(
+            *[self._analyze_chunk_async(chunk, sem) for chunk in chunks],
+            return_exceptions=True
+        )
 
-    def analyze_batch(self, posts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        analyses = []
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, (APIError, ValueError)):
+                print(f"Error analyzing posts: {result}")
+                result = [self._neutral_result(result) for _ in chunk]
+            elif isinstance(result, BaseException):
+                raise result
+            analyses.extend(result)
+
+        return analyses
+
+    def analyze_batch(self, posts: List["RedditPost"]) -> List[Dict[str, Any]]:
         """
         Analyze sentiment for multiple posts.
 
         Args:
-            posts: List of post dictionaries with 'title', 'content', etc.
+            posts: List of RedditPost records from the scraper
 
         Returns:
             List of posts with added sentiment analysis
         """
-        analyzed_posts = []
+        # Skip posts without meaningful content
+        posts = [p for p in posts if p.title or p.content]
+        if not posts:
+            return []
 
-        for post in posts:
-            title = post.get('title', '')
-            content = post.get('content', '')
-            score = post.get('score', 0)
-            num_comments = post.get('num_comments', 0)
+        # Resolve clear-cut posts locally and only escalate the rest to Claude
+        results = [self._analyze_local(p.title, p.content) for p in posts]
+        escalated = [p for p, r in zip(posts, results) if r is None]
 
-            # Skip posts without meaningful content
-            if not title and not content:
-                continue
+        if escalated:
+            # Send posts in chunks of batch_size per request, chunks concurrently
+            claude_results = iter(self._run(self._analyze_batch_async(escalated)))
+            results = [r if r is not None else next(claude_results) for r in results]
 
-            analysis = self.analyze_post(title, content, score, num_comments)
+        analyzed_posts = []
 
+        for post, analysis in zip(posts, results):
             # Combine post data with analysis
             analyzed_post = {
-                **post,
+                **post.to_dict(),
                 'sentiment': analysis['sentiment'],
                 'sentiment_score': analysis['sentiment_score'],
                 'confidence': analysis['confidence'],
                 'mentioned_assets': analysis['mentioned_assets'],
                 'key_themes': analysis['key_themes'],
-                'reasoning': analysis['reasoning']
+                'reasoning': analysis['reasoning'],
+                'analysis_failed': analysis.get('analysis_failed', False)
             }
 
             analyzed_posts.append(analyzed_post)
 
         return analyzed_posts
 
+    @staticmethod
+    def _aggregate_loop(analyzed_posts: List[Dict[str, Any]],
+                        asset_upper: Optional[str]) -> tuple:
+        """Filter and accumulate every metric in a single Python pass."""
+        total_posts = bullish_count = bearish_count = neutral_count = 0
+        sentiment_sum = confidence_sum = weighted_sum = 0.0
+        total_weight = 0
+
+        for p in analyzed_posts:
+            # Lazy map stops at the first match without building a container
+            if asset_upper and asset_upper not in map(str.upper, p.get('mentioned_assets', ())):
+                continue
+
+            sentiment = p['sentiment']
+            sentiment_score = p['sentiment_score']
+            weight = max(p.get('score', 1), 1)
+
+            total_posts += 1
+            if sentiment == 'bullish':
+                bullish_count += 1
+            elif sentiment == 'bearish':
+                bearish_count += 1
+            elif sentiment == 'neutral':
+                neutral_count += 1
+            sentiment_sum += sentiment_score
+            confidence_sum += p['confidence']
+            # Weighted sentiment (considering post score as weight)
+            weighted_sum += sentiment_score * weight
+            total_weight += weight
+
+        return (total_posts, bullish_count, bearish_count, neutral_count,
+                sentiment_sum, confidence_sum, weighted_sum, total_weight)
+
+    @staticmethod
+    def _aggregate_columns(analyzed_posts: List[Dict[str, Any]],
+                           asset_upper: Optional[str]) -> tuple:
+        """Filter posts, then reduce them as NumPy columns with the Numba kernel."""
+        if asset_upper:
+            analyzed_posts = [
+                p for p in analyzed_posts
+                if asset_upper in map(str.upper, p.get('mentioned_assets', ()))
+            ]
+
+        n = len(analyzed_posts)
+        if not n:
+            return (0, 0, 0, 0, 0.0, 0.0, 0.0, 0)
+
+        scores = np.fromiter((p['sentiment_score'] for p in analyzed_posts), np.float64, n)
+        confidences = np.fromiter((p['confidence'] for p in analyzed_posts), np.float64, n)
+        weights = np.maximum(
+            np.fromiter((p.get('score', 1) for p in analyzed_posts), np.float64, n), 1
+        )
+        sentiments = np.fromiter(
+            (_SENTIMENT_CODES.get(p['sentiment'], 2) for p in analyzed_posts), np.int8, n
+        )
+
+        (bullish_count, bearish_count, neutral_count, sentiment_sum,
+         confidence_sum, weighted_sum, total_weight) = _aggregate_kernel(
+            scores, confidences, weights, sentiments
+        )
+
+        return (n, int(bullish_count), int(bearish_count), int(neutral_count),
+                float(sentiment_sum), float(confidence_sum), float(weighted_sum),
+                float(total_weight))
+
     def aggregate_sentiment(self, analyzed_posts: List[Dict[str, Any]],
                            asset: str = None) -> Dict[str, Any]:
         """
@@ -128,16 +470,17 @@ Only respond with valid JSON, no other text."""
         Returns:
             Aggregated sentiment metrics
         """
-        # Filter by asset if specified
-        if asset:
-            relevant_posts = [
-                p for p in analyzed_posts
-                if asset.upper() in [a.upper() for a in p.get('mentioned_assets', [])]
-            ]
+        asset_upper = asset.upper() if asset else None
+
+        if _aggregate_kernel is not None and len(analyzed_posts) >= _NUMBA_MIN_POSTS:
+            totals = self._aggregate_columns(analyzed_posts, asset_upper)
         else:
-            relevant_posts = analyzed_posts
+            totals = self._aggregate_loop(analyzed_posts, asset_upper)
+
+        (total_posts, bullish_count, bearish_count, neutral_count,
+         sentiment_sum, confidence_sum, weighted_sum, total_weight) = totals
 
-        if not relevant_posts:
+        if not total_posts:
             return {
                 'asset': asset or 'ALL',
                 'post_count': 0,
@@ -149,21 +492,9 @@ Only respond with valid JSON, no other text."""
                 'weighted_sentiment': 0.0
             }
 
-        # Calculate metrics
-        total_posts = len(relevant_posts)
-        bullish_count = sum(1 for p in relevant_posts if p['sentiment'] == 'bullish')
-        bearish_count = sum(1 for p in relevant_posts if p['sentiment'] == 'bearish')
-        neutral_count = sum(1 for p in relevant_posts if p['sentiment'] == 'neutral')
-
-        avg_sentiment_score = sum(p['sentiment_score'] for p in relevant_posts) / total_posts
-        avg_confidence = sum(p['confidence'] for p in relevant_posts) / total_posts
-
-        # Weighted sentiment (considering post score as weight)
-        total_weight = sum(max(p.get('score', 1), 1) for p in relevant_posts)
-        weighted_sentiment = sum(
-            p['sentiment_score'] * max(p.get('score', 1), 1)
-            for p in relevant_posts
-        ) / total_weight if total_weight > 0 else 0.0
+        avg_sentiment_score = sentiment_sum / total_posts
+        avg_confidence = confidence_sum / total_posts
+        weighted_sentiment = weighted_sum / total_weight if total_weight > 0 else 0.0
 
         return {
             'asset': asset or 'ALL',
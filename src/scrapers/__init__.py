@@ -1,5 +1,5 @@
 """Scrapers package."""
 
-from .reddit_scraper import RedditScraper
+from .reddit_scraper import RedditScraper, RedditPost
 
-__all__ = ['RedditScraper']
+__all__ = ['RedditScraper', 'RedditPost']
@@ -1,9 +1,121 @@
 """Reddit scraper using Apify."""
 
 import os
+import re
 import time
-from typing import List, Dict, Any
+import threading
+from dataclasses import dataclass
+from typing import List, Dict, Any, Iterator, Optional
 from apify_client import ApifyClient
+from diskcache import Cache
+
+# Retries for transient Apify API failures (429/5xx/network), with backoff.
+# Pinned to apify-client 1.x's default of 8 (3.x lowered it to 4) so upgrades
+# don't quietly make scrapes less resilient
+APIFY_MAX_RETRIES = 8
+
+# Only the dataset fields _to_post and scrape_many read; skips bulky media/crosspost payloads
+DATASET_FIELDS = [
+    'id', 'title', 'selftext', 'body', 'score', 'upvote_ratio',
+    'num_comments', 'author', 'created_utc', 'url', 'permalink',
+    'subreddit', 'parsedCommunityName', 'communityName'
+]
+
+# Actor runs allowed per minute across all scrapers in the process (burst up to the same)
+APIFY_RUNS_PER_MINUTE = 30
+
+# Scraped posts are reused for this long before the actor is run again
+SCRAPE_CACHE_DIR = 'data/.scrape_cache'
+SCRAPE_CACHE_TTL = 900
+
+# Pulls the subreddit name out of a permalink or URL like /r/Bitcoin/comments/...
+_PERMALINK_SUBREDDIT_RE = re.compile(r'/r/([^/?#]+)', re.I)
+
+# Mock posts cycle through these; only id, score, comments, author and timestamps vary
+_MOCK_TEMPLATES = [
+    {
+        'title': 'Bitcoin hits new ATH! To the moon! 🚀',
+        'content': 'Just saw Bitcoin break through resistance. This bull run is looking strong. What do you all think about the current market conditions?',
+        'base_score': 1500, 'score_step': 100,
+        'upvote_ratio': 0.92,
+        'base_comments': 250, 'comments_step': 10,
+        'author_prefix': 'crypto_trader_'
+    },
+    {
+        'title': 'Ethereum merge update - concerns about validators',
+        'content': 'Has anyone else noticed the declining validator participation? Should we be worried about centralization risks?',
+        'base_score': 800, 'score_step': 50,
+        'upvote_ratio': 0.85,
+        'base_comments': 120, 'comments_step': 5,
+        'author_prefix': 'eth_hodler_'
+    },
+    {
+        'title': 'Market analysis: Why I think we are entering bear territory',
+        'content': 'Looking at the indicators, volume is declining, and we are seeing lower highs. This could be the start of a prolonged downturn. Time to take profits?',
+        'base_score': 600, 'score_step': 30,
+        'upvote_ratio': 0.78,
+        'base_comments': 180, 'comments_step': 8,
+        'author_prefix': 'bear_trader_'
+    },
+]
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available."""
+
+    def __init__(self, rate: float, capacity: int):
+        """
+        Initialize the bucket full.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum tokens held (burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping only as long as the refill requires."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            # Reserve the token now; callers queue behind each other's waits
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait:
+            time.sleep(wait)
+
+
+# Shared so concurrent requests on the same process stay within one budget
+_actor_run_limiter = TokenBucket(rate=APIFY_RUNS_PER_MINUTE / 60.0,
+                                 capacity=APIFY_RUNS_PER_MINUTE)
+
+
+@dataclass(slots=True)
+class RedditPost:
+    """A scraped Reddit post."""
+
+    id: str
+    title: str
+    content: str
+    score: int
+    upvote_ratio: float
+    num_comments: int
+    author: str
+    created_utc: int
+    url: str
+    permalink: str
+    subreddit: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the post fields as a plain dictionary."""
+        return {name: getattr(self, name) for name in self.__slots__}
 
 
 class RedditScraper:
@@ -15,12 +127,42 @@ class RedditScraper:
 
         # Only initialize client if token is available
         if self.api_token:
-            self.client = ApifyClient(self.api_token)
+            # One client per scraper so its pooled keep-alive connections are reused
+            self.client = ApifyClient(self.api_token, max_retries=APIFY_MAX_RETRIES)
+            self.cache = Cache(os.getenv('SCRAPE_CACHE_DIR', SCRAPE_CACHE_DIR))
         else:
             self.client = None
+            self.cache = None
             print("Warning: APIFY_API_TOKEN not set, will use mock data")
 
-    def scrape_subreddit(self, subreddit: str, max_posts: int = 50) -> List[Dict[str, Any]]:
+    def iter_subreddit(self, subreddit: str, max_posts: int = 50) -> Iterator[RedditPost]:
+        """
+        Yield posts from a subreddit as the Apify dataset is paged in.
+
+        Args:
+            subreddit: Name of the subreddit (without r/)
+            max_posts: Maximum number of posts to scrape
+
+        Returns:
+            Iterator of RedditPost records; Apify errors propagate to the caller
+        """
+        # Use mock data if no API token
+        if not self.client:
+            yield from self._get_mock_data(subreddit, max_posts)
+            return
+
+        run_input = self._build_run_input([subreddit], max_posts)
+
+        # Run the actor and wait for it to finish; 429s are retried by the client
+        _actor_run_limiter.acquire()
+        run = self.client.actor("trudax/reddit-scraper").call(run_input=run_input)
+
+        # Stream results page by page instead of holding them all
+        for item in self.client.dataset(run["defaultDatasetId"]).iterate_items(
+                fields=DATASET_FIELDS, clean=True):
+            yield self._to_post(item, subreddit)
+
+    def scrape_subreddit(self, subreddit: str, max_posts: int = 50) -> List[RedditPost]:
         """
         Scrape posts from a subreddit using Apify Reddit Scraper.
 
@@ -29,7 +171,7 @@ class RedditScraper:
             max_posts: Maximum number of posts to scrape
 
         Returns:
-            List of post dictionaries with title, content, score, etc.
+            List of RedditPost records with title, content, score, etc.
         """
         print(f"Scraping r/{subreddit}...")
 
@@ -37,43 +179,17 @@ class RedditScraper:
         if not self.client:
             return self._get_mock_data(subreddit, max_posts)
 
-        # Use Apify's Reddit Scraper actor
-        # Actor ID: trudax/reddit-scraper or vaclavrut/reddit-scraper
-        run_input = {
-            "startUrls": [
-                {"url": f"https://www.reddit.com/r/{subreddit}/hot/"}
-            ],
-            "maxItems": max_posts,
-            "maxPostCount": max_posts,
-            "skipComments": True,
-            "searchType": "posts",
-            "sort": "hot"
-        }
+        cached = self.cache.get((subreddit, max_posts))
+        if cached is not None:
+            print(f"Using {len(cached)} cached posts for r/{subreddit}")
+            return cached
 
         try:
-            # Run the actor and wait for it to finish
-            run = self.client.actor("trudax/reddit-scraper").call(run_input=run_input)
-
-            # Fetch results
-            posts = []
-            for item in self.client.dataset(run["defaultDatasetId"]).iterate_items():
-                # Extract relevant fields
-                post_data = {
-                    'id': item.get('id', ''),
-                    'title': item.get('title', ''),
-                    'content': item.get('selftext', '') or item.get('body', ''),
-                    'score': item.get('score', 0),
-                    'upvote_ratio': item.get('upvote_ratio', 0),
-                    'num_comments': item.get('num_comments', 0),
-                    'author': item.get('author', ''),
-                    'created_utc': item.get('created_utc', 0),
-                    'url': item.get('url', ''),
-                    'permalink': item.get('permalink', ''),
-                    'subreddit': subreddit
-                }
-                posts.append(post_data)
+            posts = list(self.iter_subreddit(subreddit, max_posts))
 
             print(f"Successfully scraped {len(posts)} posts from r/{subreddit}")
+            if posts:
+                self.cache.set((subreddit, max_posts), posts, expire=SCRAPE_CACHE_TTL)
             return posts
 
         except Exception as e:
@@ -81,9 +197,9 @@ class RedditScraper:
             # Fallback: Return mock data for testing
             return self._get_mock_data(subreddit, max_posts)
 
-    def scrape_multiple_subreddits(self, subreddits: List[str], max_posts_per_sub: int = 50) -> Dict[str, List[Dict[str, Any]]]:
+    def scrape_many(self, subreddits: List[str], max_posts_per_sub: int = 50) -> Dict[str, List[RedditPost]]:
         """
-        Scrape posts from multiple subreddits.
+        Scrape several subreddits with a single Apify actor run.
 
         Args:
             subreddits: List of subreddit names
@@ -93,60 +209,140 @@ class RedditScraper:
             Dictionary mapping subreddit names to lists of posts
         """
         results = {}
+        pending = []
 
+        # Serve recently scraped subreddits from the cache
         for subreddit in subreddits:
-            posts = self.scrape_subreddit(subreddit, max_posts_per_sub)
-            results[subreddit] = posts
-            # Be nice to the API
-            time.sleep(2)
+            cached = self.cache.get((subreddit, max_posts_per_sub))
+            if cached is not None:
+                print(f"Using {len(cached)} cached posts for r/{subreddit}")
+                results[subreddit] = cached
+            else:
+                pending.append(subreddit)
+
+        if not pending:
+            return results
+
+        print(f"Scraping {', '.join('r/' + s for s in pending)}...")
+
+        run_input = self._build_run_input(pending, max_posts_per_sub)
+
+        # Run the actor once for all start URLs and wait for it to finish
+        _actor_run_limiter.acquire()
+        run = self.client.actor("trudax/reddit-scraper").call(run_input=run_input)
 
-        return results
+        # Bucket items back to the requested subreddits
+        by_name = {s.lower(): s for s in pending}
+        scraped = {s: [] for s in pending}
 
-    def _get_mock_data(self, subreddit: str, count: int = 10) -> List[Dict[str, Any]]:
+        for item in self.client.dataset(run["defaultDatasetId"]).iterate_items(
+                fields=DATASET_FIELDS, clean=True):
+            subreddit = by_name.get(self._item_subreddit(item))
+            # With a single start URL every item belongs to it
+            if subreddit is None and len(pending) == 1:
+                subreddit = pending[0]
+            if subreddit and len(scraped[subreddit]) < max_posts_per_sub:
+                scraped[subreddit].append(self._to_post(item, subreddit))
+
+        for subreddit, posts in scraped.items():
+            print(f"Successfully scraped {len(posts)} posts from r/{subreddit}")
+            # An empty bucket may be a parsing miss; scrape it again next time
+            if posts:
+                self.cache.set((subreddit, max_posts_per_sub), posts, expire=SCRAPE_CACHE_TTL)
+
+        results.update(scraped)
+        return {s: results[s] for s in subreddits}
+
+    def scrape_multiple_subreddits(self, subreddits: List[str], max_posts_per_sub: int = 50) -> Dict[str, List[RedditPost]]:
+        """
+        Scrape posts from multiple subreddits in one actor run.
+
+        Args:
+            subreddits: List of subreddit names
+            max_posts_per_sub: Maximum posts per subreddit
+
+        Returns:
+            Dictionary mapping subreddit names to lists of posts
+        """
+        # Use mock data if no API token
+        if not self.client:
+            return {s: self._get_mock_data(s, max_posts_per_sub) for s in subreddits}
+
+        try:
+            return self.scrape_many(subreddits, max_posts_per_sub)
+
+        except Exception as e:
+            print(f"Error scraping subreddits: {e}")
+            # Fallback: Return mock data for testing
+            return {s: self._get_mock_data(s, max_posts_per_sub) for s in subreddits}
+
+    def _build_run_input(self, subreddits: List[str], max_posts_per_sub: int) -> Dict[str, Any]:
+        """Build the Apify Reddit Scraper input for one or more subreddits."""
+        # Actor ID: trudax/reddit-scraper or vaclavrut/reddit-scraper
+        return {
+            "startUrls": [
+                {"url": f"https://www.reddit.com/r/{subreddit}/hot/"}
+                for subreddit in subreddits
+            ],
+            "maxItems": max_posts_per_sub * len(subreddits),
+            "maxPostCount": max_posts_per_sub,
+            "skipComments": True,
+            "searchType": "posts",
+            "sort": "hot"
+        }
+
+    @staticmethod
+    def _item_subreddit(item: Dict[str, Any]) -> Optional[str]:
+        """Lowercased subreddit of a dataset item, or None if it can't be told."""
+        # Prefer the actor's own community field over parsing links
+        name = item.get('parsedCommunityName') or item.get('subreddit') or item.get('communityName')
+        if name:
+            return name.removeprefix('r/').lower()
+
+        for link in (item.get('permalink') or '', item.get('url') or ''):
+            match = _PERMALINK_SUBREDDIT_RE.search(link)
+            if match:
+                return match.group(1).lower()
+
+        return None
+
+    def _to_post(self, item: Dict[str, Any], subreddit: str) -> RedditPost:
+        """Extract the relevant fields from an Apify dataset item."""
+        return RedditPost(
+            id=item.get('id', ''),
+            title=item.get('title', ''),
+            content=item.get('selftext', '') or item.get('body', ''),
+            score=item.get('score', 0),
+            upvote_ratio=item.get('upvote_ratio', 0),
+            num_comments=item.get('num_comments', 0),
+            author=item.get('author', ''),
+            created_utc=item.get('created_utc', 0),
+            url=item.get('url', ''),
+            permalink=item.get('permalink', ''),
+            subreddit=subreddit
+        )
+
+    def _get_mock_data(self, subreddit: str, count: int = 10) -> List[RedditPost]:
         """Generate mock data for testing when Apify is unavailable."""
         print(f"Using mock data for r/{subreddit}")
 
-        mock_posts = [
-            {
-                'id': f'mock_{i}',
-                'title': f'Bitcoin hits new ATH! To the moon! 🚀',
-                'content': 'Just saw Bitcoin break through resistance. This bull run is looking strong. What do you all think about the current market conditions?',
-                'score': 1500 + i * 100,
-                'upvote_ratio': 0.92,
-                'num_comments': 250 + i * 10,
-                'author': f'crypto_trader_{i}',
-                'created_utc': int(time.time()) - (i * 3600),
-                'url': f'https://reddit.com/r/{subreddit}/mock_{i}',
-                'permalink': f'/r/{subreddit}/comments/mock_{i}',
-                'subreddit': subreddit
-            } if i % 3 == 0 else
-            {
-                'id': f'mock_{i}',
-                'title': f'Ethereum merge update - concerns about validators',
-                'content': 'Has anyone else noticed the declining validator participation? Should we be worried about centralization risks?',
-                'score': 800 + i * 50,
-                'upvote_ratio': 0.85,
-                'num_comments': 120 + i * 5,
-                'author': f'eth_hodler_{i}',
-                'created_utc': int(time.time()) - (i * 3600),
-                'url': f'https://reddit.com/r/{subreddit}/mock_{i}',
-                'permalink': f'/r/{subreddit}/comments/mock_{i}',
-                'subreddit': subreddit
-            } if i % 3 == 1 else
-            {
-                'id': f'mock_{i}',
-                'title': f'Market analysis: Why I think we are entering bear territory',
-                'content': 'Looking at the indicators, volume is declining, and we are seeing lower highs. This could be the start of a prolonged downturn. Time to take profits?',
-                'score': 600 + i * 30,
-                'upvote_ratio': 0.78,
-                'num_comments': 180 + i * 8,
-                'author': f'bear_trader_{i}',
-                'created_utc': int(time.time()) - (i * 3600),
-                'url': f'https://reddit.com/r/{subreddit}/mock_{i}',
-                'permalink': f'/r/{subreddit}/comments/mock_{i}',
-                'subreddit': subreddit
-            }
-            for i in range(min(count, 20))
-        ]
+        now = int(time.time())
+        mock_posts = []
+
+        for i in range(min(count, 20)):
+            t = _MOCK_TEMPLATES[i % 3]
+            mock_posts.append(RedditPost(
+                id=f'mock_{i}',
+                title=t['title'],
+                content=t['content'],
+                score=t['base_score'] + i * t['score_step'],
+                upvote_ratio=t['upvote_ratio'],
+                num_comments=t['base_comments'] + i * t['comments_step'],
+                author=f"{t['author_prefix']}{i}",
+                created_utc=now - (i * 3600),
+                url=f'https://reddit.com/r/{subreddit}/mock_{i}',
+                permalink=f'/r/{subreddit}/comments/mock_{i}',
+                subreddit=subreddit
+            ))
 
         return mock_posts
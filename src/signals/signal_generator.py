@@ -1,12 +1,31 @@
 """Trading signal generator based on sentiment analysis."""
 
+import time
+from collections import Counter, defaultdict
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
+import numpy as np
+
+
+@lru_cache(maxsize=1)
+def _iso(second: int) -> str:
+    """ISO timestamp for a Unix second, reused by every signal within that second."""
+    return datetime.fromtimestamp(second).isoformat()
+
 
 class SignalGenerator:
     """Generates trading signals based on sentiment analysis."""
 
+    # (weighted sentiment threshold, min bullish/bearish %, signal type, confidence multiplier, label)
+    _RULES = (
+        (0.5, 60, "BUY", 1.0, "Strong bullish sentiment detected"),
+        (0.25, 50, "BUY", 0.8, "Moderate bullish sentiment"),
+        (-0.5, 60, "SELL", 1.0, "Strong bearish sentiment detected"),
+        (-0.25, 50, "SELL", 0.8, "Moderate bearish sentiment"),
+    )
+
     def __init__(self, min_confidence: float = 0.6, min_posts: int = 3):
         """
         Initialize signal generator.
@@ -42,36 +61,19 @@ class SignalGenerator:
         if avg_confidence < self.min_confidence:
             return None
 
-        # Determine signal type and confidence
-        signal_type = None
-        confidence_score = 0.0
-        reasoning = ""
-
-        # Strong bullish signal
-        if weighted_sentiment > 0.5 and bullish_pct > 60:
-            signal_type = "BUY"
-            confidence_score = min(avg_confidence * (bullish_pct / 100), 1.0)
-            reasoning = f"Strong bullish sentiment detected: {bullish_pct:.1f}% bullish posts, weighted sentiment {weighted_sentiment:.2f}"
-
-        # Moderate bullish signal
-        elif weighted_sentiment > 0.25 and bullish_pct > 50:
-            signal_type = "BUY"
-            confidence_score = min(avg_confidence * 0.8 * (bullish_pct / 100), 1.0)
-            reasoning = f"Moderate bullish sentiment: {bullish_pct:.1f}% bullish posts, weighted sentiment {weighted_sentiment:.2f}"
-
-        # Strong bearish signal
-        elif weighted_sentiment < -0.5 and bearish_pct > 60:
-            signal_type = "SELL"
-            confidence_score = min(avg_confidence * (bearish_pct / 100), 1.0)
-            reasoning = f"Strong bearish sentiment detected: {bearish_pct:.1f}% bearish posts, weighted sentiment {weighted_sentiment:.2f}"
-
-        # Moderate bearish signal
-        elif weighted_sentiment < -0.25 and bearish_pct > 50:
-            signal_type = "SELL"
-            confidence_score = min(avg_confidence * 0.8 * (bearish_pct / 100), 1.0)
-            reasoning = f"Moderate bearish sentiment: {bearish_pct:.1f}% bearish posts, weighted sentiment {weighted_sentiment:.2f}"
-
-        # No clear signal
+        # First matching rule wins; no match means no clear signal
+        for threshold, min_pct, signal_type, multiplier, label in self._RULES:
+            if signal_type == "BUY":
+                pct, mood = bullish_pct, "bullish"
+                matched = weighted_sentiment > threshold
+            else:
+                pct, mood = bearish_pct, "bearish"
+                matched = weighted_sentiment < threshold
+
+            if matched and pct > min_pct:
+                confidence_score = min(avg_confidence * multiplier * (pct / 100), 1.0)
+                reasoning = f"{label}: {pct:.1f}% {mood} posts, weighted sentiment {weighted_sentiment:.2f}"
+                break
         else:
             return None
 
@@ -86,7 +88,7 @@ class SignalGenerator:
             'sentiment_score': weighted_sentiment,
             'post_count': post_count,
             'reasoning': reasoning,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': _iso(int(time.time())),
             'bullish_pct': bullish_pct,
             'bearish_pct': bearish_pct
         }
@@ -105,16 +107,25 @@ class SignalGenerator:
         """
         signals = []
 
+        # Index posts by asset in one pass so each aggregation only sees its own posts
+        by_asset = defaultdict(list)
+        for post in analyzed_posts:
+            for asset in {a.upper() for a in post.get('mentioned_assets', [])}:
+                by_asset[asset].append(post)
+
         # Auto-detect assets if not specified
         if not target_assets:
-            all_assets = set()
-            for post in analyzed_posts:
-                all_assets.update(post.get('mentioned_assets', []))
-            target_assets = list(all_assets)
+            target_assets = list(by_asset)
 
         # Generate signal for each asset
         for asset in target_assets:
-            aggregated = self._aggregate_sentiment(analyzed_posts, asset)
+            asset_posts = by_asset.get(asset.upper(), [])
+
+            # Too few mentions can never pass generate_signal's post_count gate
+            if len(asset_posts) < self.min_posts:
+                continue
+
+            aggregated = self._aggregate_sentiment(asset_posts, asset, prefiltered=True)
             signal = self.generate_signal(aggregated)
 
             if signal:
@@ -123,19 +134,20 @@ class SignalGenerator:
         return signals
 
     def _aggregate_sentiment(self, analyzed_posts: List[Dict[str, Any]],
-                            asset: str = None) -> Dict[str, Any]:
+                            asset: str = None, prefiltered: bool = False) -> Dict[str, Any]:
         """
         Aggregate sentiment across multiple posts (internal helper).
 
         Args:
             analyzed_posts: List of posts with sentiment analysis
             asset: Optional asset to filter by (e.g., "BTC", "ETH")
+            prefiltered: True if analyzed_posts already only mention asset
 
         Returns:
             Aggregated sentiment metrics
         """
         # Filter by asset if specified
-        if asset:
+        if asset and not prefiltered:
             relevant_posts = [
                 p for p in analyzed_posts
                 if asset.upper() in [a.upper() for a in p.get('mentioned_assets', [])]
@@ -155,21 +167,30 @@ class SignalGenerator:
                 'weighted_sentiment': 0.0
             }
 
-        # Calculate metrics
+        # Calculate metrics in a single pass
         total_posts = len(relevant_posts)
-        bullish_count = sum(1 for p in relevant_posts if p['sentiment'] == 'bullish')
-        bearish_count = sum(1 for p in relevant_posts if p['sentiment'] == 'bearish')
-        neutral_count = sum(1 for p in relevant_posts if p['sentiment'] == 'neutral')
+        counts = Counter()
+        sentiment_sum = confidence_sum = weighted_sum = 0.0
+        total_weight = 0
+
+        for p in relevant_posts:
+            sentiment_score = p['sentiment_score']
+            # Weighted sentiment (considering post score as weight)
+            weight = max(p.get('score', 1), 1)
 
-        avg_sentiment_score = sum(p['sentiment_score'] for p in relevant_posts) / total_posts
-        avg_confidence = sum(p['confidence'] for p in relevant_posts) / total_posts
+            counts[p['sentiment']] += 1
+            sentiment_sum += sentiment_score
+            confidence_sum += p['confidence']
+            weighted_sum += sentiment_score * weight
+            total_weight += weight
 
-        # Weighted sentiment (considering post score as weight)
-        total_weight = sum(max(p.get('score', 1), 1) for p in relevant_posts)
-        weighted_sentiment = sum(
-            p['sentiment_score'] * max(p.get('score', 1), 1)
-            for p in relevant_posts
-        ) / total_weight if total_weight > 0 else 0.0
+        bullish_count = counts['bullish']
+        bearish_count = counts['bearish']
+        neutral_count = counts['neutral']
+
+        avg_sentiment_score = sentiment_sum / total_posts
+        avg_confidence = confidence_sum / total_posts
+        weighted_sentiment = weighted_sum / total_weight if total_weight > 0 else 0.0
 
         return {
             'asset': asset or 'ALL',
@@ -232,3 +253,25 @@ class SignalGenerator:
         position_size = base_position * (0.5 + 0.5 * scaled_confidence)
 
         return round(position_size, 2)
+
+    def calculate_position_sizes(self, signals: List[Dict[str, Any]],
+                                 account_balance: float = 10000.0,
+                                 max_position_pct: float = 0.1) -> np.ndarray:
+        """
+        Calculate position sizes for many signals at once.
+
+        Args:
+            signals: Trading signals
+            account_balance: Total account balance
+            max_position_pct: Maximum percentage of account per position
+
+        Returns:
+            Array of position sizes in dollars, one per signal
+        """
+        confidence = np.fromiter((s['confidence_score'] for s in signals),
+                                 dtype=np.float64, count=len(signals))
+        base_position = account_balance * max_position_pct
+
+        # Same scaling as calculate_position_size, applied to the whole array
+        scaled_confidence = (confidence - 0.6) / 0.4
+        return np.round(base_position * (0.5 + 0.5 * scaled_confidence), 2)
@@ -2,25 +2,46 @@
 """Demo script to test the system with mock data (no API keys required)."""
 
 import os
+import re
 import sys
 import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from itertools import chain
+
+import numpy as np
 
 from src.database import TradingDatabase
 from src.scrapers import RedditScraper
 
+# Batches at least this large are split across worker processes
+PARALLEL_MIN_POSTS = 5000
+
+
 # Mock sentiment analyzer for testing without API key
 class MockSentimentAnalyzer:
     """Mock analyzer for testing."""
 
+    # Compiled once per class; search() stops at the first hit
+    _BULL_RE = re.compile('moon|bullish|buy|rally|pump|ath|surge')
+    _BEAR_RE = re.compile('crash|bearish|sell|dump|concern|risk|bear')
+    # Lookahead so overlapping names (e.g. "dogeth") are all found
+    _ASSET_RE = re.compile('(?=(bitcoin|btc|ethereum|eth|dogecoin|doge))')
+    _TICKERS = {
+        'bitcoin': 'BTC', 'btc': 'BTC',
+        'ethereum': 'ETH', 'eth': 'ETH',
+        'dogecoin': 'DOGE', 'doge': 'DOGE',
+    }
+
     def analyze_post(self, title, content, score=0, num_comments=0):
-        # Simple keyword-based sentiment
-        text = (title + " " + content).lower()
+        # Simple keyword-based sentiment; text is lowercased once per post
+        text = f"{title} {content}".lower()
 
-        if any(word in text for word in ['moon', 'bullish', 'buy', 'rally', 'pump', 'ath', 'surge']):
+        if self._BULL_RE.search(text):
             sentiment = 'bullish'
             sentiment_score = 0.7
-        elif any(word in text for word in ['crash', 'bearish', 'sell', 'dump', 'concern', 'risk', 'bear']):
+        elif self._BEAR_RE.search(text):
             sentiment = 'bearish'
             sentiment_score = -0.7
         else:
@@ -28,13 +49,8 @@ class MockSentimentAnalyzer:
             sentiment_score = 0.0
 
         # Extract assets
-        mentioned_assets = []
-        if 'bitcoin' in text or 'btc' in text:
-            mentioned_assets.append('BTC')
-        if 'ethereum' in text or 'eth' in text:
-            mentioned_assets.append('ETH')
-        if 'doge' in text or 'dogecoin' in text:
-            mentioned_assets.append('DOGE')
+        found = {self._TICKERS[m.group(1)] for m in self._ASSET_RE.finditer(text)}
+        mentioned_assets = [asset for asset in ('BTC', 'ETH', 'DOGE') if asset in found]
 
         return {
             'sentiment': sentiment,
@@ -46,22 +62,47 @@ class MockSentimentAnalyzer:
         }
 
     def analyze_batch(self, posts):
-        analyzed = []
+        # Process startup and pickling only pay off for large batches on multiple cores
+        workers = os.cpu_count() or 1
+        if workers < 2 or len(posts) < PARALLEL_MIN_POSTS:
+            return self._analyze_serial(posts)
+
+        size = -(-len(posts) // workers)
+        chunks = [posts[i:i + size] for i in range(0, len(posts), size)]
+
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            return list(chain.from_iterable(ex.map(_analyze_chunk, chunks)))
+
+    def _analyze_serial(self, posts):
+        return list(self.analyze_stream(posts))
+
+    def analyze_stream(self, posts):
+        # Analyze posts as they arrive, e.g. from RedditScraper.iter_subreddit
         for post in posts:
             analysis = self.analyze_post(
-                post.get('title', ''),
-                post.get('content', ''),
-                post.get('score', 0),
-                post.get('num_comments', 0)
+                post.title,
+                post.content,
+                post.score,
+                post.num_comments
             )
-            analyzed.append({**post, **analysis})
-        return analyzed
-
-    def aggregate_sentiment(self, analyzed_posts, asset=None):
-        if asset:
+            yield {**post.to_dict(), **analysis}
+
+    def index_by_asset(self, analyzed_posts):
+        # Uppercase every post's assets once; reuse the index across per-asset calls
+        by_asset = defaultdict(list)
+        for p in analyzed_posts:
+            for a in {a.upper() for a in p.get('mentioned_assets', [])}:
+                by_asset[a].append(p)
+        return by_asset
+
+    def aggregate_sentiment(self, analyzed_posts, asset=None, asset_index=None):
+        if asset and asset_index is not None:
+            relevant_posts = asset_index.get(asset.upper(), [])
+        elif asset:
+            asset_upper = asset.upper()
             relevant_posts = [
                 p for p in analyzed_posts
-                if asset.upper() in [a.upper() for a in p.get('mentioned_assets', [])]
+                if any(a.upper() == asset_upper for a in p.get('mentioned_assets', []))
             ]
         else:
             relevant_posts = analyzed_posts
@@ -78,19 +119,23 @@ class MockSentimentAnalyzer:
                 'weighted_sentiment': 0.0
             }
 
+        # Pull each field into an array once, then reduce in numpy
         total_posts = len(relevant_posts)
-        bullish_count = sum(1 for p in relevant_posts if p['sentiment'] == 'bullish')
-        bearish_count = sum(1 for p in relevant_posts if p['sentiment'] == 'bearish')
-        neutral_count = sum(1 for p in relevant_posts if p['sentiment'] == 'neutral')
-
-        avg_sentiment_score = sum(p['sentiment_score'] for p in relevant_posts) / total_posts
-        avg_confidence = sum(p['confidence'] for p in relevant_posts) / total_posts
-
-        total_weight = sum(max(p.get('score', 1), 1) for p in relevant_posts)
-        weighted_sentiment = sum(
-            p['sentiment_score'] * max(p.get('score', 1), 1)
-            for p in relevant_posts
-        ) / total_weight if total_weight > 0 else 0.0
+        sentiments = np.array([p['sentiment'] for p in relevant_posts])
+        scores = np.fromiter((p['sentiment_score'] for p in relevant_posts),
+                             dtype=np.float64, count=total_posts)
+        confidences = np.fromiter((p['confidence'] for p in relevant_posts),
+                                  dtype=np.float64, count=total_posts)
+        weights = np.maximum(np.fromiter((p.get('score', 1) for p in relevant_posts),
+                                         dtype=np.float64, count=total_posts), 1)
+
+        bullish_count = int(np.count_nonzero(sentiments == 'bullish'))
+        bearish_count = int(np.count_nonzero(sentiments == 'bearish'))
+        neutral_count = int(np.count_nonzero(sentiments == 'neutral'))
+
+        avg_sentiment_score = float(scores.mean())
+        avg_confidence = float(confidences.mean())
+        weighted_sentiment = float(np.average(scores, weights=weights))
 
         return {
             'asset': asset or 'ALL',
@@ -106,6 +151,11 @@ class MockSentimentAnalyzer:
         }
 
 
+def _analyze_chunk(posts):
+    """Analyze one chunk of posts inside a worker process."""
+    return MockSentimentAnalyzer()._analyze_serial(posts)
+
+
 def main():
     """Run demo test."""
     print("=" * 60)
@@ -148,17 +198,7 @@ def main():
 
     # Store analyzed posts
     print("\nStoring analyzed posts...")
-    for post in analyzed_posts:
-        db.add_analyzed_post(
-            post_id=post['id'],
-            subreddit=post['subreddit'],
-            title=post['title'],
-            content=post['content'],
-            sentiment=post['sentiment'],
-            sentiment_score=post['sentiment_score'],
-            mentioned_assets=','.join(post.get('mentioned_assets', [])),
-            url=post.get('url', '')
-        )
+    db.add_analyzed_posts(analyzed_posts)
 
     # Show sentiment breakdown
     print("\nSentiment Breakdown:")
@@ -179,7 +219,10 @@ def main():
 
     print(f"\nGenerated {len(signals)} trading signals:")
 
-    for i, signal in enumerate(signals, 1):
+    # Store all signals in one transaction
+    signal_ids = db.add_signals(signals, source_subreddit=','.join(subreddits))
+
+    for i, (signal, signal_id) in enumerate(zip(signals, signal_ids), 1):
         print(f"\n  Signal {i}:")
         print(f"    Asset: {signal['asset']}")
         print(f"    Type: {signal['signal_type']}")
@@ -187,17 +230,6 @@ def main():
         print(f"    Sentiment Score: {signal['sentiment_score']:.2f}")
         print(f"    Based on: {signal['post_count']} posts")
         print(f"    Reasoning: {signal['reasoning']}")
-
-        # Store signal
-        signal_id = db.add_signal(
-            asset=signal['asset'],
-            signal_type=signal['signal_type'],
-            confidence_score=signal['confidence_score'],
-            sentiment_score=signal['sentiment_score'],
-            source_subreddit=','.join(subreddits),
-            post_count=signal['post_count'],
-            reasoning=signal['reasoning']
-        )
         print(f"    ✓ Stored as signal ID: {signal_id}")
 
         # Create a paper trade
@@ -0,0 +1,8 @@
+"""WSGI entrypoint for running the dashboard under gunicorn with gevent workers."""
+
+# Patch blocking socket/thread primitives before anything imports them
+from gevent import monkey
+
+monkey.patch_all()
+
+from app import app  # noqa: E402